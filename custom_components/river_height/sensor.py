@@ -1,11 +1,25 @@
+# Perf note: Numba/JIT is not suitable here. The workload is HTML parsing and
+# string handling, which Numba cannot compile in nopython mode, so it gains
+# nothing. Optimizations belong at the lxml and string-method layer:
+# incremental parsing, early filtering and cheap cell cleaning, as done below.
+import ftplib
+import hashlib
+import http.client
 import logging
-from urllib.request import urlopen
-from urllib.error import URLError
+import math
+import posixpath
+import re
+import time
+import zlib
+from urllib.error import HTTPError
+from urllib.parse import urlparse, unquote
+from urllib.request import Request, urlopen
 from datetime import timedelta
-from bs4 import BeautifulSoup, Comment
 from dataclasses import dataclass
-from typing import Optional, List, Union, Dict, Any
+from sys import intern
+from typing import Optional, List, Union, Dict, Any, Iterable, Iterator, Tuple
 
+from lxml import etree
 import voluptuous as vol
 
 # Import statements modified to make the code runnable outside Home Assistant when __name__ == "__main__"
@@ -68,6 +82,39 @@ except ImportError:
 
 _LOGGER = logging.getLogger(__name__)
 
+# Bytes fed to the incremental HTML parser at a time
+_PARSE_CHUNK_SIZE = 16384
+
+# Elements a table row can sit directly inside
+_ROW_PARENTS = frozenset(('table', 'thead', 'tbody', 'tfoot'))
+
+# Start of the first table; everything before it is never parsed
+_TABLE_START_RE = re.compile(rb'<table[\s>]', re.IGNORECASE)
+_TABLE_START_OVERLAP = len(b'<table ') - 1
+
+# Deletes the thousands separators and unit suffix from a height cell
+# such as "1,234.50" or "2.05m" in a single pass
+_HEIGHT_TABLE = str.maketrans('', '', ',m')
+
+# Characters a numeric height cell can start with, so blank and text cells
+# are skipped without raising from float()
+_HEIGHT_START = frozenset('0123456789+-.')
+
+# Read size for FTP and HTTP downloads; a BOM page arrives in a few reads
+_READ_BLOCKSIZE = 65536
+
+# Compressed encoding requested from HTTP servers. deflate is left out as
+# servers disagree on whether to send it zlib wrapped or raw
+_HTTP_ACCEPT_ENCODING = 'gzip'
+
+# Longest a kept FTP connection may sit idle before it is assumed dead.
+# Servers and NAT gateways commonly drop idle connections within minutes,
+# so the connection is only kept for update intervals shorter than this
+_FTP_MAX_IDLE = 60
+
+# Returned by the coordinator's fetch when the remote file has not changed
+_UNCHANGED = object()
+
 CONF_URL = "url"
 CONF_STATION_FILTER = "station_filter"
 
@@ -98,9 +145,11 @@ def setup_platform(
     station_filter = config.get(CONF_STATION_FILTER)
     scan_interval = config.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
 
-    # Verify the URL starts with ftp://
-    if not url.startswith('ftp://'):
-        _LOGGER.error("Only FTP URLs are supported (starting with ftp://)")
+    # Verify the URL starts with ftp://, http:// or https://
+    if not url.startswith(('ftp://', 'http://', 'https://')):
+        _LOGGER.error(
+            "Only FTP and HTTP(S) URLs are supported (starting with ftp://, "
+            "http:// or https://)")
         return
 
     if IN_HA:
@@ -121,7 +170,7 @@ def setup_platform(
         add_entities([sensor], True)
 
 
-@dataclass
+@dataclass(slots=True)
 class RiverData:
     """Data structure to hold river information."""
     station_name: str
@@ -131,81 +180,404 @@ class RiverData:
     status: str
     metadata: Optional[str] = None
 
-    # Add additional properties that may be needed for sensor entity functionality
-    unit_of_measurement: Optional[str] = None
-    device_class: Optional[str] = None
-    state_class: Optional[str] = None
-    entity_id: Optional[str] = None
-    unique_id: Optional[str] = None
 
-    def title_matches(self, search: str) -> bool:
-        """Check if the station name contains the search string (case insensitive)."""
-        return search.lower() in self.station_name.lower()
+def _iter_chunks(html_content: Union[bytes, Iterable[bytes]]) -> Iterator[bytes]:
+    """Yield HTML content as bytes chunks for the incremental parser."""
+    if isinstance(html_content, (bytes, bytearray)):
+        view = memoryview(html_content)
+        for start in range(0, len(view), _PARSE_CHUNK_SIZE):
+            yield bytes(view[start:start + _PARSE_CHUNK_SIZE])
+    else:
+        # Already chunked, e.g. the blocks received from the FTP server
+        yield from html_content
 
 
-def _parse_river_data(row_data: List[str], metadata: Optional[str] = None) -> Optional[RiverData]:
-    """Parse a row of data into a RiverData object."""
-    if len(row_data) < 6:
-        return None
+def _iter_rows(html_content: Union[bytes, Iterable[bytes]]) -> Iterator[Tuple[List[str], Optional[str]]]:
+    """
+    Incrementally parse HTML and yield (cells, metadata) for each table row.
+    Rows are dropped from the tree once read, so memory stays flat.
+    """
+    # Decode as UTF-8 regardless of whether the page declares a charset.
+    # A parser costs a couple of microseconds to build, so each call gets its
+    # own rather than sharing one: coordinators parse on executor threads
+    # concurrently, and a lazy parse abandoned part way leaves state behind
+    parser = etree.HTMLPullParser(
+        events=('end', 'comment'), tag='tr', encoding='utf-8')
+    metadata_by_row = {}
+    chunks = _iter_chunks(html_content)
+
+    # Only table rows are read, so skip the head, scripts and navigation
+    # that precede the first table rather than building a tree for them
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        match = _TABLE_START_RE.search(pending)
+        if match is not None:
+            break
+        # Keep enough of the tail to catch a tag split across two chunks
+        pending = pending[-_TABLE_START_OVERLAP:]
+    else:
+        return
 
-    try:
-        height_text = row_data[2].strip()
-        height = float(height_text.replace(',', '').replace('m', ''))
-        return RiverData(
-            station_name=row_data[0].strip(),
-            timestamp=row_data[1].strip(),
-            height=height,
-            trend=row_data[3].strip(),
-            status=row_data[5].strip(),
-            metadata=metadata
-        )
-    except (ValueError, IndexError):
-        return None
+    parser.feed(pending[match.start():])
+    yield from _read_row_events(parser, metadata_by_row)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_row_events(parser, metadata_by_row)
+    parser.close()
+    yield from _read_row_events(parser, metadata_by_row)
 
 
-def _parse_table(html_content: str, return_river_data: bool = False) -> Union[List[List[str]], List[RiverData]]:
+def _read_row_events(parser, metadata_by_row) -> Iterator[Tuple[List[str], Optional[str]]]:
+    """
+    Yield the rows completed since the parser's events were last read.
+    BOM tables are flat (no tables nested inside cells), so only a row's
+    direct parent and direct <td> children are looked at. A nested table
+    would lose its rows from the outer cell's text once they are freed.
     """
-    Parse HTML content using BeautifulSoup to extract table data.
+    for event, elem in parser.read_events():
+        if event == 'comment':
+            # Remember metadata comments against the row they sit in
+            if elem.text and "METADATA" in elem.text:
+                tr = next(elem.iterancestors('tr'), None)
+                if tr is not None:
+                    metadata_by_row.setdefault(tr, elem.text.strip())
+            continue
+
+        metadata = metadata_by_row.pop(elem, None)
+        parent = elem.getparent()
+        if parent is not None and parent.tag in _ROW_PARENTS:
+            # Extract cell data from the row's own cells. Plain
+            # <td>value</td> cells read .text directly; only cells with
+            # nested markup need their whole subtree's text joined
+            yield ([(td.text or '').strip() if len(td) == 0
+                    else ''.join(td.itertext()).strip()
+                    for td in elem.iterchildren('td')], metadata)
+
+        # Free the finished row and any earlier siblings
+        elem.clear(keep_tail=True)
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def _iter_river_data(html_content: Union[bytes, Iterable[bytes]],
+                     station_filter: Optional[str] = None) -> Iterator[RiverData]:
+    """
+    Lazily parse HTML content and yield river data from its tables.
+    Parsing only advances as far as the consumer reads, so stopping at the
+    first match leaves the rest of the page unparsed.
     Args:
-        html_content: HTML content to parse
-        return_river_data: If True, returns List[RiverData], otherwise List[List[str]]
+        html_content: Raw HTML bytes, or a sequence of bytes chunks, to parse
+        station_filter: If set, only rows whose station name contains it
+            (case insensitive) are yielded
     """
     if not html_content:
-        return []
-
-    soup = BeautifulSoup(html_content, 'html.parser')
-    rows = []
-
-    # Find all tables in the document
-    tables = soup.find_all('table', recursive=True)  # Only top-level tables
-    for table in tables:
-        # For each table, process each row
-        for tr in table.find_all('tr', recursive=True):  # Only direct child rows
-            # Look for metadata in comments before the row
-            metadata = None
-            comments = tr.find_all(
-                string=lambda text: isinstance(text, Comment))
-            for comment in comments:
-                if "METADATA" in comment:
-                    metadata = comment.strip()
-                    break
-
-            # Extract cell data
-            row_data = []
-            for td in tr.find_all(['td']):
-                # Get text content, excluding nested table content
-                cell_text = ''.join(text for text in td.stripped_strings)
-                row_data.append(cell_text)
-
-            if row_data:
-                if return_river_data:
-                    river = _parse_river_data(row_data, metadata)
-                    if river is not None:
-                        rows.append(river)
-                else:
-                    rows.append(row_data)
+        return
+
+    filter_cf = station_filter.casefold() if station_filter else None
+
+    for row_data, metadata in _iter_rows(html_content):
+        # A river row needs all six columns; drop header and short rows
+        if len(row_data) < 6:
+            continue
+
+        # Skip non-matching stations before doing any further work on them
+        if filter_cf and filter_cf not in row_data[0].casefold():
+            continue
+
+        # Cells arrive already stripped from _iter_rows. Blank and text
+        # cells are rejected up front, leaving the except for the rare cell
+        # that only looks numeric
+        height_text = row_data[2]
+        if not height_text or height_text[0] not in _HEIGHT_START:
+            continue
+        # Most cells are plain or only carry the unit suffix, which a slice
+        # handles without translating; separators only appear above 1000m
+        if ',' in height_text:
+            height_text = height_text.translate(_HEIGHT_TABLE)
+        elif height_text[-1] == 'm':
+            height_text = height_text[:-1]
+        try:
+            height = float(height_text)
+        except ValueError:
+            continue
+        # float() also accepts signed "-inf" and "-nan", which get past the
+        # first-character check
+        if not math.isfinite(height):
+            continue
+
+        # Positional arguments: station_name, timestamp, height, trend,
+        # status. Names, trends and statuses repeat across rows and
+        # updates, so they are interned to share one string object each
+        yield RiverData(
+            intern(row_data[0]), row_data[1], height,
+            intern(row_data[3]), intern(row_data[5]), metadata)
+
+
+def _parse_table(html_content: Union[bytes, Iterable[bytes]],
+                 station_filter: Optional[str] = None) -> List[RiverData]:
+    """
+    Parse HTML content using lxml to extract river data from its tables.
+    Args:
+        html_content: Raw HTML bytes, or a sequence of bytes chunks, to parse
+        station_filter: If set, only rows whose station name contains it
+            (case insensitive) are returned
+    """
+    return list(_iter_river_data(html_content, station_filter))
+
+
+class _Download:
+    """
+    Collects a file's content as it is received, decompressing gzip on the
+    fly and hashing it so unchanged downloads can be recognised.
+    """
 
-    return rows
+    def __init__(self, gzipped=False):
+        """Initialize, expecting a gzipped body if gzipped is set."""
+        # Keep the received blocks as they are, hashing them on the way in,
+        # so they can be fed to the parser without being joined
+        self._blocks = []
+        self._hasher = hashlib.blake2b(digest_size=16)
+        # Decompress each block as it arrives rather than buffering the
+        # compressed file first
+        self._decompressor = (zlib.decompressobj(zlib.MAX_WBITS | 16)
+                              if gzipped else None)
+
+    def receive(self, block):
+        """Add a block of the file as received."""
+        if self._decompressor is not None:
+            block = self._decompressor.decompress(block)
+        self._add(block)
+
+    def finish(self, last_digest):
+        """
+        Complete the download and return (content, digest), where content
+        is the list of blocks, or _UNCHANGED if the digest matches
+        last_digest. Raises zlib.error if a gzipped body was cut short.
+        """
+        if self._decompressor is not None:
+            self._add(self._decompressor.flush())
+            # flush() accepts a stream that stops early without complaint
+            if not self._decompressor.eof:
+                raise zlib.error("Compressed data ended before the end of stream")
+
+        # Fall back to the body hash for servers with unreliable validators
+        digest = self._hasher.digest()
+        if digest == last_digest:
+            return _UNCHANGED, digest
+        return self._blocks, digest
+
+    def _add(self, block):
+        """Store and hash a block of decompressed content."""
+        if block:
+            self._blocks.append(block)
+            self._hasher.update(block)
+
+
+class _FtpFile:
+    """
+    A single file on an FTP server, fetched over a connection kept open
+    between fetches when they come often enough to reuse it.
+    Downloads are skipped when the file has not changed since the last one.
+    """
+
+    def __init__(self, url, update_interval=None):
+        """Initialize from an ftp:// URL and the expected time between fetches."""
+        self.url = url
+        self._keep_open = (update_interval is not None
+                           and update_interval.total_seconds() <= _FTP_MAX_IDLE)
+        parsed = urlparse(url)
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._user = parsed.username or ''
+        self._passwd = parsed.password or ''
+        self._dirpath, self._filename = posixpath.split(unquote(parsed.path))
+
+        # FTP control connection kept open between fetches, and when it
+        # was last used
+        self._ftp = None
+        self._last_used = 0.0
+        # Name of the file actually downloaded, chosen again after every
+        # reconnect in case the gzipped copy has come or gone
+        self._remote_file = None
+
+        # Stamps of the last downloaded file, used to skip unchanged fetches
+        self._last_mdtm = None
+        self._last_size = None
+        self._last_digest = None
+
+    def fetch(self, timeout=10):
+        """
+        Fetch the file's content as a list of received bytes blocks.
+        Returns _UNCHANGED if the file matches the previous download, or
+        None on error.
+        """
+        try:
+            if not self.url.startswith('ftp://'):
+                _LOGGER.error("Only FTP URLs are supported: %s", self.url)
+                return None
+
+            ftp = self._connect(timeout)
+
+            if self._remote_file is None:
+                self._remote_file = self._select_remote_file(
+                    ftp, self._filename)
+            remote_file = self._remote_file
+
+            # Compare the modification time and size before downloading
+            try:
+                mdtm = ftp.sendcmd('MDTM ' + remote_file)[4:].strip()
+                size = ftp.size(remote_file)
+            except ftplib.error_perm:
+                mdtm = size = None
+
+            if (mdtm is not None and mdtm == self._last_mdtm
+                    and size == self._last_size):
+                return _UNCHANGED
+
+            download = _Download(gzipped=remote_file.endswith('.gz'))
+            ftp.retrbinary('RETR ' + remote_file, download.receive,
+                           blocksize=_READ_BLOCKSIZE)
+            content, self._last_digest = download.finish(self._last_digest)
+
+            self._last_mdtm = mdtm
+            self._last_size = size
+            return content
+        except ftplib.all_errors + (zlib.error,) as e:
+            # A corrupt .gz raises from inside retrbinary, leaving the
+            # transfer's reply unread, so the connection can't be reused
+            _LOGGER.error("Error fetching FTP URL %s: %s", self.url, e)
+            self.close()
+            return None
+        finally:
+            self._last_used = time.monotonic()
+            if not self._keep_open:
+                # The next fetch comes too late to reuse the connection, so
+                # log out now rather than hold a session open on the server
+                self.close()
+
+    @staticmethod
+    def _select_remote_file(ftp, filename):
+        """Prefer the smaller gzipped copy of the file when the server has one."""
+        try:
+            ftp.size(filename + '.gz')
+            return filename + '.gz'
+        except ftplib.error_perm:
+            return filename
+
+    def _connect(self, timeout):
+        """Return the open FTP connection, reconnecting if it has dropped."""
+        if self._ftp is not None:
+            if time.monotonic() - self._last_used > _FTP_MAX_IDLE:
+                # Almost certainly dropped by now; probing it could block for
+                # the whole timeout, so discard it without a QUIT
+                ftp, self._ftp = self._ftp, None
+                ftp.close()
+                self._remote_file = None
+            else:
+                try:
+                    self._ftp.voidcmd('NOOP')
+                    return self._ftp
+                except ftplib.all_errors:
+                    self.close()
+
+        ftp = ftplib.FTP(timeout=timeout)
+        try:
+            ftp.connect(self._host, self._port or ftplib.FTP_PORT, timeout)
+            ftp.set_pasv(True)
+            ftp.login(self._user, self._passwd)
+            ftp.voidcmd('TYPE I')
+            if self._dirpath:
+                ftp.cwd(self._dirpath)
+        except ftplib.all_errors:
+            ftp.close()
+            raise
+
+        self._ftp = ftp
+        return ftp
+
+    def close(self):
+        """Close the FTP connection, if one is open."""
+        self._remote_file = None
+        if self._ftp is None:
+            return
+
+        ftp, self._ftp = self._ftp, None
+        try:
+            ftp.quit()
+        except ftplib.all_errors:
+            ftp.close()
+
+
+class _HttpFile:
+    """
+    A single file on an HTTP(S) server, fetched with compression.
+    Downloads are skipped when the file has not changed since the last one.
+    """
+
+    def __init__(self, url):
+        """Initialize from an http:// or https:// URL."""
+        self.url = url
+
+        # Validators of the last downloaded file, sent back on the next fetch
+        self._etag = None
+        self._last_modified = None
+        self._last_digest = None
+
+    def fetch(self, timeout=10):
+        """
+        Fetch the file's content as a list of received bytes blocks.
+        Returns _UNCHANGED if the file matches the previous download, or
+        None on error.
+        """
+        headers = {'Accept-Encoding': _HTTP_ACCEPT_ENCODING}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+
+        try:
+            with urlopen(Request(self.url, headers=headers),
+                         timeout=timeout) as response:
+                encoding = response.headers.get(
+                    'Content-Encoding', 'identity').strip().lower()
+                if encoding not in ('gzip', 'x-gzip', 'identity'):
+                    _LOGGER.error("Unsupported Content-Encoding %r from %s",
+                                  encoding, self.url)
+                    return None
+
+                download = _Download(gzipped=encoding != 'identity')
+                while True:
+                    block = response.read(_READ_BLOCKSIZE)
+                    if not block:
+                        break
+                    download.receive(block)
+                content, self._last_digest = download.finish(
+                    self._last_digest)
+
+                # Only kept once finish() has confirmed the body is whole
+                self._etag = response.headers.get('ETag')
+                self._last_modified = response.headers.get('Last-Modified')
+                return content
+        except HTTPError as e:
+            if e.code == 304:
+                return _UNCHANGED
+            _LOGGER.error("Error fetching HTTP URL %s: %s", self.url, e)
+            return None
+        except (OSError, http.client.HTTPException, zlib.error) as e:
+            _LOGGER.error("Error fetching HTTP URL %s: %s", self.url, e)
+            return None
+
+    def close(self):
+        """Nothing to close; each fetch uses its own connection."""
+
+
+def _file_for_url(url, update_interval=None):
+    """Return the fetcher for a URL, picked by its scheme."""
+    if url.startswith(('http://', 'https://')):
+        return _HttpFile(url)
+    return _FtpFile(url, update_interval)
 
 
 class RiverHeightDataCoordinator(DataUpdateCoordinator):
@@ -223,20 +595,43 @@ class RiverHeightDataCoordinator(DataUpdateCoordinator):
         self.station_filter = station_filter
         self.rivers = []
         self.selected_river = None
+        # Attribute view of every station, rebuilt only when rivers change
+        self.all_stations = []
+
+        # Casefolded once, rather than on every update
+        self._filter_cf = station_filter.casefold() if station_filter else None
+
+        # Source file, fetched over FTP or HTTP(S) depending on the URL
+        self._source = _file_for_url(url, update_interval)
 
     async def _async_update_data(self):
         """Fetch data from BOM."""
         try:
-            # Use a separate method for the actual data fetching
-            return await self.hass.async_add_executor_job(self._fetch_river_data)
+            html_content = await self.hass.async_add_executor_job(
+                self._source.fetch, 10)
+
+            if html_content is _UNCHANGED:
+                # Nothing changed on the server, so no parse job is needed
+                return self.selected_river
+
+            # Parsing is CPU-bound, so it runs as its own executor job
+            return await self.hass.async_add_executor_job(
+                self._process_river_data, html_content)
         except Exception as err:
             _LOGGER.error("Error updating river height data: %s", err)
             raise
 
     def _fetch_river_data(self):
         """Fetch river height data from BOM."""
+        html_content = self._source.fetch(timeout=10)
+        return self._process_river_data(html_content)
+
+    def _process_river_data(self, html_content):
+        """Parse fetched content and select the configured river."""
         try:
-            html_content = self._fetch_url_content(self.url, timeout=10)
+            if html_content is _UNCHANGED:
+                # Nothing changed on the server, so the last parse still holds
+                return self.selected_river
 
             if not html_content:
                 _LOGGER.error(
@@ -244,18 +639,30 @@ class RiverHeightDataCoordinator(DataUpdateCoordinator):
                 return None
 
             # Parse all rivers from the table
-            self.rivers = _parse_table(html_content, return_river_data=True)
+            self.selected_river = None
+            self.rivers = _parse_table(html_content)
+            self.all_stations = [
+                {
+                    "station_name": river.station_name,
+                    "height": river.height,
+                    "timestamp": river.timestamp,
+                    "trend": river.trend,
+                    "status": river.status
+                } for river in self.rivers if river is not None
+            ]
 
             if not self.rivers:
                 _LOGGER.warning("No river data found at %s", self.url)
                 return None
 
             # If we have a station filter, try to find that specific river
-            if self.station_filter:
-                for river in self.rivers:
-                    if river.title_matches(self.station_filter):
-                        self.selected_river = river
-                        return river
+            if self._filter_cf:
+                river = next((r for r in self.rivers
+                              if self._filter_cf in r.station_name.casefold()),
+                             None)
+                if river is not None:
+                    self.selected_river = river
+                    return river
                 _LOGGER.warning(
                     "Could not find river matching filter: %s", self.station_filter)
                 return None
@@ -268,117 +675,9 @@ class RiverHeightDataCoordinator(DataUpdateCoordinator):
                 "Unexpected error processing river height data from %s: %s", self.url, err)
             return None
 
-    def _fetch_url_content(self, url, timeout=10):
-        """Fetch content from FTP URL."""
-        try:
-            if not url.startswith('ftp://'):
-                _LOGGER.error("Only FTP URLs are supported: %s", url)
-                return None
-
-            with urlopen(url, timeout=timeout) as response:
-                return response.read().decode('utf-8')
-        except URLError as e:
-            _LOGGER.error("Error fetching FTP URL %s: %s", url, str(e))
-            return None
-
-
-class RiverHeightBaseSensor(CoordinatorEntity, SensorEntity):
-    """Base class for river height sensors."""
-
-    def __init__(self, coordinator, name, unit_of_measurement):
-        """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._name = name
-        self._unit_of_measurement = unit_of_measurement
-        self._attr_unique_id = f"{name.lower().replace(' ', '_')}"
-
-    @property
-    def name(self):
-        """Return the name of the sensor."""
-        return self._name
-
-    @property
-    def available(self):
-        """Return if entity is available."""
-        return self.coordinator.last_update_success and self.coordinator.data is not None
-
-
-class RiverHeightCoordinatorSensor(RiverHeightBaseSensor):
-    """Implementation of the river height sensor."""
-
-    @property
-    def native_value(self):
-        """Return the river height."""
-        if self.coordinator.data:
-            return self.coordinator.data.height
-        return None
-
-    @property
-    def native_unit_of_measurement(self):
-        """Return the unit of measurement."""
-        return self._unit_of_measurement
-
-    @property
-    def extra_state_attributes(self):
-        """Return extra attributes from the river height data."""
-        if not self.coordinator.data:
-            return {}
-
-        attrs = {
-            "station_name": self.coordinator.data.station_name,
-            "timestamp": self.coordinator.data.timestamp,
-            "trend": self.coordinator.data.trend,
-            "status": self.coordinator.data.status,
-        }
-
-        if self.coordinator.data.metadata:
-            attrs["metadata"] = self.coordinator.data.metadata
-
-        return attrs
-
-
-class RiverStationSensor(RiverHeightBaseSensor):
-    """Implementation of the river station name sensor."""
-
-    @property
-    def native_value(self):
-        """Return the river station name."""
-        if self.coordinator.data:
-            return self.coordinator.data.station_name
-        return None
-
-
-class RiverTimestampSensor(RiverHeightBaseSensor):
-    """Implementation of the river timestamp sensor."""
-
-    @property
-    def native_value(self):
-        """Return the timestamp of the river data."""
-        if self.coordinator.data:
-            return self.coordinator.data.timestamp
-        return None
-
-
-class RiverTrendSensor(RiverHeightBaseSensor):
-    """Implementation of the river trend sensor."""
-
-    @property
-    def native_value(self):
-        """Return the river trend."""
-        if self.coordinator.data:
-            return self.coordinator.data.trend
-        return None
-
-
-class RiverStatusSensor(RiverHeightBaseSensor):
-    """Implementation of the river status sensor."""
-
-    @property
-    def native_value(self):
-        """Return the river status."""
-        if self.coordinator.data:
-            return self.coordinator.data.status
-        return None
+    def close(self):
+        """Close the connection to the source file, if one is open."""
+        self._source.close()
 
 
 class RiverHeightSensor(SensorEntity):
@@ -395,6 +694,9 @@ class RiverHeightSensor(SensorEntity):
         self._rivers = []
         self._selected_river = None
 
+        # (casefolded name, river) pairs for _rivers, rebuilt in _set_rivers
+        self._norm_names = ()
+
         # Attributes for the data format
         self._station_name = None
         self._timestamp = None
@@ -402,6 +704,10 @@ class RiverHeightSensor(SensorEntity):
         self._status = None
         self._metadata = None
 
+        # Source file, and the rivers parsed from its last download
+        self._source = _file_for_url(url, DEFAULT_SCAN_INTERVAL)
+        self._last_rivers = []
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -442,7 +748,7 @@ class RiverHeightSensor(SensorEntity):
 
     @property
     def all_rivers(self) -> List[RiverData]:
-        """Return all rivers in the dataset."""
+        """Return the parsed rivers (only the first match if a station filter is set)."""
         return self._rivers
 
     def select_river(self, search_title: str) -> bool:
@@ -450,12 +756,21 @@ class RiverHeightSensor(SensorEntity):
         Select a specific river by searching for a title.
         Returns True if a matching river was found.
         """
-        for river in self._rivers:
-            if search_title.lower() in river.station_name.lower():
-                self._selected_river = river
-                self._update_state_from_river(river)
-                return True
-        return False
+        search = search_title.casefold()
+
+        # First substring match in page order, as the coordinator does
+        river = next((r for name, r in self._norm_names if search in name), None)
+        if river is None:
+            return False
+
+        self._selected_river = river
+        self._update_state_from_river(river)
+        return True
+
+    def _set_rivers(self, rivers: List[RiverData]) -> None:
+        """Store the parsed rivers along with their casefolded names."""
+        self._rivers = rivers
+        self._norm_names = tuple((r.station_name.casefold(), r) for r in rivers)
 
     def _update_state_from_river(self, river: RiverData) -> None:
         """Update sensor state from a RiverData object."""
@@ -467,19 +782,6 @@ class RiverHeightSensor(SensorEntity):
         self._metadata = river.metadata
         self._available = True
 
-    def _fetch_url_content(self, url, timeout=10):
-        """Fetch content from FTP URL."""
-        try:
-            if not url.startswith('ftp://'):
-                _LOGGER.error("Only FTP URLs are supported: %s", url)
-                return None
-
-            with urlopen(url, timeout=timeout) as response:
-                return response.read().decode('utf-8')
-        except URLError as e:
-            _LOGGER.error("Error fetching FTP URL %s: %s", url, str(e))
-            return None
-
     @Throttle(DEFAULT_SCAN_INTERVAL)
     def update(self):
         """
@@ -489,19 +791,28 @@ class RiverHeightSensor(SensorEntity):
         # Reset state before update
         self._state = None
         self._available = False
-        self._rivers = []
+        self._set_rivers([])
         self._selected_river = None
 
         try:
-            html_content = self._fetch_url_content(self._url, timeout=10)
+            html_content = self._source.fetch(timeout=10)
 
-            if not html_content:
+            if html_content is _UNCHANGED:
+                # An unchanged file parses to the same rivers, so reuse them
+                self._set_rivers(self._last_rivers)
+            elif not html_content:
                 _LOGGER.error(
                     "Error fetching river height data from %s", self._url)
                 return
-
-            # Parse all rivers from the table
-            self._rivers = _parse_table(html_content, return_river_data=True)
+            else:
+                rivers = _iter_river_data(html_content, self._station_filter)
+                if self._station_filter:
+                    # Only the first match is used, so stop parsing there
+                    river = next(rivers, None)
+                    self._last_rivers = [river] if river is not None else []
+                else:
+                    self._last_rivers = list(rivers)
+                self._set_rivers(self._last_rivers)
 
             if not self._rivers:
                 _LOGGER.warning("No river data found at %s", self._url)
@@ -537,6 +848,10 @@ class RiverHeightEntity(CoordinatorEntity, SensorEntity):
         self._attr_device_class = None
         self._attr_state_class = SensorStateClass.MEASUREMENT
 
+        # (data, all_stations, attrs) from the last read, reused until the
+        # coordinator publishes new data
+        self._cached_attrs = None
+
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -557,28 +872,27 @@ class RiverHeightEntity(CoordinatorEntity, SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return all river data as attributes."""
-        if not self.coordinator.data:
+        data = self.coordinator.data
+        if not data:
             return {}
 
+        all_stations = self.coordinator.all_stations
+        cached = self._cached_attrs
+        if cached is not None and cached[0] is data and cached[1] is all_stations:
+            return cached[2]
+
         attrs = {
-            "station_name": self.coordinator.data.station_name,
-            "timestamp": self.coordinator.data.timestamp,
-            "trend": self.coordinator.data.trend,
-            "status": self.coordinator.data.status,
-            "all_stations": [
-                {
-                    "station_name": river.station_name,
-                    "height": river.height,
-                    "timestamp": river.timestamp,
-                    "trend": river.trend,
-                    "status": river.status
-                } for river in self.coordinator.rivers if river is not None
-            ]
+            "station_name": data.station_name,
+            "timestamp": data.timestamp,
+            "trend": data.trend,
+            "status": data.status,
+            "all_stations": all_stations
         }
 
-        if self.coordinator.data.metadata:
-            attrs["metadata"] = self.coordinator.data.metadata
+        if data.metadata:
+            attrs["metadata"] = data.metadata
 
+        self._cached_attrs = (data, all_stations, attrs)
         return attrs
 
     @property
@@ -586,6 +900,11 @@ class RiverHeightEntity(CoordinatorEntity, SensorEntity):
         """Return if entity is available."""
         return self.coordinator.last_update_success and self.coordinator.data is not None
 
+    async def async_will_remove_from_hass(self):
+        """Close the coordinator's connection when the entity is removed."""
+        await super().async_will_remove_from_hass()
+        await self.hass.async_add_executor_job(self.coordinator.close)
+
 
 if __name__ == "__main__":
     import sys
@@ -1,11 +1,19 @@
+import asyncio
+import ftplib
+import gzip
+import threading
 import unittest
-from bs4 import BeautifulSoup
 from datetime import timedelta
-from unittest.mock import MagicMock
-from custom_compoents.river_height.sensor import (
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+from custom_components.river_height.sensor import (
     RiverHeightSensor,
     RiverHeightEntity,
+    RiverHeightDataCoordinator,
     _parse_table,
+    _FtpFile,
+    _HttpFile,
+    _UNCHANGED,
     RiverData
 )
 
@@ -52,6 +60,47 @@ class TestRiverHeightSensor(unittest.TestCase):
             for i, river in enumerate(sensor.all_rivers, 1):
                 print(f"{i}. {river.station_name} - Height: {river.height}m")
 
+    def test_select_river_takes_first_match(self):
+        sensor = RiverHeightSensor(
+            name="River Height Test",
+            url="ftp://ftp.bom.gov.au/anon/gen/fwo/IDQ60005.html",
+            unit_of_measurement="m"
+        )
+        sensor._set_rivers([
+            RiverData("Albert R at Bromfleet #", "08.45AM Tue", 2.05, "rising", "minor"),
+            RiverData("Albert R", "08.30AM Tue", 1.5, "steady", "below minor"),
+        ])
+
+        # An exact name later on the page does not beat an earlier substring
+        self.assertTrue(sensor.select_river("ALBERT R"))
+        self.assertEqual(sensor._station_name, "Albert R at Bromfleet #")
+        self.assertFalse(sensor.select_river("Coomera"))
+
+    def test_update_reuses_rivers_when_unchanged(self):
+        sensor = RiverHeightSensor(
+            name="River Height Test",
+            url="ftp://ftp.bom.gov.au/anon/gen/fwo/IDQ60005.html",
+            unit_of_measurement="m"
+        )
+        sensor._source = MagicMock()
+        sensor._source.fetch.side_effect = [SAMPLE_HTML, _UNCHANGED, None]
+
+        sensor.update(no_throttle=True)
+        rivers = sensor.all_rivers
+        self.assertEqual(len(rivers), 3)
+
+        # An unchanged file reuses the rivers parsed from the last download
+        sensor.update(no_throttle=True)
+        self.assertIs(sensor.all_rivers, rivers)
+        self.assertTrue(sensor.available)
+        self.assertEqual(sensor._station_name, "Coomera R at Oxenford Weir #")
+        self.assertEqual(sensor._state, 1.23)
+
+        # A failed fetch leaves the sensor unavailable
+        sensor.update(no_throttle=True)
+        self.assertFalse(sensor.available)
+        self.assertEqual(sensor.all_rivers, [])
+
     def test_consolidated_entity(self):
         """Test the new consolidated entity approach with coordinator."""
         url = "ftp://ftp.bom.gov.au/anon/gen/fwo/IDQ60005.html"
@@ -86,6 +135,15 @@ class TestRiverHeightSensor(unittest.TestCase):
         )
         mock_coordinator.last_update_success = True
         mock_coordinator.rivers = sensor._rivers
+        mock_coordinator.all_stations = [
+            {
+                "station_name": river.station_name,
+                "height": river.height,
+                "timestamp": river.timestamp,
+                "trend": river.trend,
+                "status": river.status
+            } for river in sensor._rivers
+        ]
 
         # Create the consolidated entity
         entity = RiverHeightEntity(mock_coordinator, "River Height Test", "m")
@@ -103,6 +161,10 @@ class TestRiverHeightSensor(unittest.TestCase):
         self.assertIn("trend", attributes)
         self.assertIn("status", attributes)
         self.assertIn("all_stations", attributes)
+        self.assertEqual(attributes["all_stations"],
+                         mock_coordinator.all_stations)
+        self.assertEqual(
+            attributes["all_stations"][0]["station_name"], sensor._station_name)
 
         # Check if the station name matches our filter
         self.assertTrue(station_filter in attributes["station_name"])
@@ -117,5 +179,388 @@ class TestRiverHeightSensor(unittest.TestCase):
             f"Number of all stations available: {len(attributes.get('all_stations', []))}")
 
 
+class TestRiverHeightEntity(unittest.TestCase):
+    def test_attributes_cached_until_data_changes(self):
+        coordinator = MagicMock()
+        coordinator.data = RiverData(
+            "Albert R at Bromfleet #", "08.45AM Tue", 2.05, "rising", "minor")
+        coordinator.all_stations = [{"station_name": "Albert R at Bromfleet #"}]
+        entity = RiverHeightEntity(coordinator, "River Height Test", "m")
+
+        attributes = entity.extra_state_attributes
+        self.assertIs(entity.extra_state_attributes, attributes)
+
+        # A new station list builds a new dict
+        coordinator.all_stations = list(coordinator.all_stations)
+        new_attributes = entity.extra_state_attributes
+        self.assertIsNot(new_attributes, attributes)
+        self.assertIs(new_attributes["all_stations"], coordinator.all_stations)
+
+        # So does a new river, even with the same station list
+        coordinator.data = RiverData(
+            "Albert R at Bromfleet #", "09.00AM Tue", 2.10, "rising", "minor")
+        latest = entity.extra_state_attributes
+        self.assertIsNot(latest, new_attributes)
+        self.assertEqual(latest["timestamp"], "09.00AM Tue")
+        self.assertIs(entity.extra_state_attributes, latest)
+
+
+class TestRiverHeightDataCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.jobs = []
+
+        async def async_add_executor_job(func, *args):
+            self.jobs.append(func)
+            return func(*args)
+
+        hass = MagicMock()
+        hass.async_add_executor_job = async_add_executor_job
+        self.coordinator = RiverHeightDataCoordinator(
+            hass, "ftp://ftp.bom.gov.au/anon/gen/fwo/IDQ60005.html",
+            "bromfleet", timedelta(minutes=30))
+        self.coordinator._source = MagicMock()
+
+    def test_unchanged_keeps_previous_data(self):
+        coordinator = self.coordinator
+        coordinator._source.fetch.side_effect = [SAMPLE_HTML, _UNCHANGED]
+
+        river = asyncio.run(coordinator._async_update_data())
+        self.assertEqual(river.station_name, "Albert R at Bromfleet #")
+        all_stations = coordinator.all_stations
+        self.assertEqual(len(all_stations), 3)
+
+        # No parse job runs, and the same objects are published again
+        self.jobs.clear()
+        self.assertIs(asyncio.run(coordinator._async_update_data()), river)
+        self.assertIs(coordinator.all_stations, all_stations)
+        self.assertEqual(self.jobs, [coordinator._source.fetch])
+
+    def test_changed_content_is_parsed_again(self):
+        coordinator = self.coordinator
+        coordinator._source.fetch.side_effect = [
+            SAMPLE_HTML, SAMPLE_HTML.replace(b"2.05m", b"2.50m")]
+
+        asyncio.run(coordinator._async_update_data())
+        all_stations = coordinator.all_stations
+
+        river = asyncio.run(coordinator._async_update_data())
+        self.assertEqual(river.height, 2.5)
+        self.assertIsNot(coordinator.all_stations, all_stations)
+        self.assertEqual(coordinator.all_stations[1]["height"], 2.5)
+
+
+# A BOM style page: a decoy row in a script, a header row, a METADATA
+# comment, markup inside a cell, a short row, formatted heights and
+# heights that are not numbers
+SAMPLE_HTML = b"""<html><head><meta charset="utf-8"><title>Rivers</title>
+<script>var x = "<tr><td>decoy</td></tr>";</script></head>
+<body><div>nav</div>
+<table border="1">
+<tr><th>Station Name</th><th>Time/Day</th><th>Height</th><th>Tendency</th><th>Crossing</th><th>Flood Class</th></tr>
+<tr><td>Coomera R at Oxenford Weir #</td><td>09.00AM Tue</td><td>1.23</td><td>steady</td><td></td><td>below minor</td></tr>
+<tr><!-- METADATA: gauge 146012 --><td>Albert R at Bromfleet #</td><td>08.45AM Tue</td><td>2.05m</td><td>rising</td><td></td><td>minor</td></tr>
+<tr><td>Big R at <b>Weir</b></td><td>08.30AM Tue</td><td>1,234.5m</td><td>falling</td><td></td><td>below minor</td></tr>
+<tr><td>Short row</td><td>x</td></tr>
+<tr><td>Dry R</td><td>08.30AM Tue</td><td>N/A</td><td>steady</td><td></td><td>-</td></tr>
+<tr><td>Broken R</td><td>08.30AM Tue</td><td>-inf</td><td>steady</td><td></td><td>-</td></tr>
+<tr><td>Faulty R</td><td>08.30AM Tue</td><td>-nan</td><td>steady</td><td></td><td>-</td></tr>
+</table>
+</body></html>"""
+
+
+class TestParseTable(unittest.TestCase):
+    def test_parses_rows(self):
+        rivers = _parse_table(SAMPLE_HTML)
+
+        self.assertEqual(
+            [river.station_name for river in rivers],
+            ["Coomera R at Oxenford Weir #", "Albert R at Bromfleet #",
+             "Big R at Weir"])
+        self.assertEqual(
+            rivers[0],
+            RiverData(
+                station_name="Coomera R at Oxenford Weir #",
+                timestamp="09.00AM Tue",
+                height=1.23,
+                trend="steady",
+                status="below minor"
+            ))
+
+    def test_heights(self):
+        rivers = _parse_table(SAMPLE_HTML)
+
+        self.assertEqual([river.height for river in rivers], [1.23, 2.05, 1234.5])
+
+    def test_skips_non_numeric_heights(self):
+        names = [river.station_name for river in _parse_table(SAMPLE_HTML)]
+
+        for name in ("Dry R", "Broken R", "Faulty R"):
+            self.assertNotIn(name, names)
+
+    def test_metadata_comment(self):
+        rivers = _parse_table(SAMPLE_HTML)
+
+        self.assertIsNone(rivers[0].metadata)
+        self.assertEqual(rivers[1].metadata, "METADATA: gauge 146012")
+        self.assertIsNone(rivers[2].metadata)
+
+    def test_station_filter(self):
+        rivers = _parse_table(SAMPLE_HTML, station_filter="bromfleet")
+
+        self.assertEqual(len(rivers), 1)
+        self.assertEqual(rivers[0].station_name, "Albert R at Bromfleet #")
+        self.assertEqual(_parse_table(SAMPLE_HTML, station_filter="nowhere"), [])
+
+    def test_chunk_boundaries(self):
+        expected = _parse_table(SAMPLE_HTML)
+
+        # Split everywhere, including inside the "<table" tag and the comment
+        for i in range(1, len(SAMPLE_HTML)):
+            chunks = [SAMPLE_HTML[:i], SAMPLE_HTML[i:]]
+            self.assertEqual(_parse_table(chunks), expected, f"split at {i}")
+
+    def test_no_table(self):
+        self.assertEqual(_parse_table(b"<html><body>No data</body></html>"), [])
+        self.assertEqual(_parse_table(b""), [])
+
+
+class FakeFTP:
+    """In-memory stand-in for ftplib.FTP serving the files in FakeFTP.files."""
+    # name -> (MDTM stamp, or None if the server lacks MDTM, content)
+    files = {}
+    instances = []
+
+    def __init__(self, timeout=None):
+        self.retrieved = []
+        self.quit_sent = False
+        self.closed = False
+        FakeFTP.instances.append(self)
+
+    def connect(self, host, port, timeout):
+        self.address = (host, port)
+
+    def set_pasv(self, value):
+        pass
+
+    def login(self, user, passwd):
+        pass
+
+    def cwd(self, dirpath):
+        self.dirpath = dirpath
+
+    def voidcmd(self, cmd):
+        return "200 OK"
+
+    def _file(self, name):
+        if name not in self.files:
+            raise ftplib.error_perm("550 No such file or directory.")
+        return self.files[name]
+
+    def sendcmd(self, cmd):
+        mdtm, _ = self._file(cmd[len("MDTM "):])
+        if mdtm is None:
+            raise ftplib.error_perm("500 Unknown command.")
+        return "213 " + mdtm
+
+    def size(self, name):
+        return len(self._file(name)[1])
+
+    def retrbinary(self, cmd, callback, blocksize=8192):
+        name = cmd[len("RETR "):]
+        data = self._file(name)[1]
+        self.retrieved.append(name)
+        for start in range(0, len(data), blocksize):
+            callback(data[start:start + blocksize])
+
+    def quit(self):
+        self.quit_sent = True
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class TestFtpFile(unittest.TestCase):
+    URL = "ftp://example.com:2121/anon/gen/fwo/IDQ60005.html"
+
+    def setUp(self):
+        FakeFTP.files = {}
+        FakeFTP.instances = []
+        patcher = patch("ftplib.FTP", FakeFTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def retrieved(self):
+        """Return the files downloaded over every connection made."""
+        return [name for ftp in FakeFTP.instances for name in ftp.retrieved]
+
+    def test_unchanged_mdtm_and_size_skip_download(self):
+        FakeFTP.files = {"IDQ60005.html": ("20240101000000", SAMPLE_HTML)}
+        ftp_file = _FtpFile(self.URL)
+
+        self.assertEqual(b"".join(ftp_file.fetch()), SAMPLE_HTML)
+        self.assertIs(ftp_file.fetch(), _UNCHANGED)
+
+        ftp = FakeFTP.instances[0]
+        self.assertEqual(ftp.address, ("example.com", 2121))
+        self.assertEqual(ftp.dirpath, "/anon/gen/fwo")
+        self.assertEqual(self.retrieved(), ["IDQ60005.html"])
+
+    def test_digest_fallback_without_mdtm(self):
+        FakeFTP.files = {"IDQ60005.html": (None, SAMPLE_HTML)}
+        ftp_file = _FtpFile(self.URL)
+
+        self.assertEqual(b"".join(ftp_file.fetch()), SAMPLE_HTML)
+        self.assertIs(ftp_file.fetch(), _UNCHANGED)
+
+        FakeFTP.files = {"IDQ60005.html": (None, SAMPLE_HTML + b" ")}
+        self.assertEqual(b"".join(ftp_file.fetch()), SAMPLE_HTML + b" ")
+        self.assertEqual(len(self.retrieved()), 3)
+
+    def test_prefers_gzipped_copy(self):
+        FakeFTP.files = {
+            "IDQ60005.html": ("20240101000000", SAMPLE_HTML),
+            "IDQ60005.html.gz": ("20240101000000", gzip.compress(SAMPLE_HTML)),
+        }
+        ftp_file = _FtpFile(self.URL)
+
+        self.assertEqual(b"".join(ftp_file.fetch()), SAMPLE_HTML)
+        self.assertEqual(FakeFTP.instances[0].retrieved, ["IDQ60005.html.gz"])
+
+    def test_closes_connection_for_long_intervals(self):
+        FakeFTP.files = {"IDQ60005.html": ("20240101000000", SAMPLE_HTML)}
+        ftp_file = _FtpFile(self.URL, timedelta(minutes=30))
+
+        ftp_file.fetch()
+        self.assertTrue(FakeFTP.instances[0].quit_sent)
+
+        self.assertIs(ftp_file.fetch(), _UNCHANGED)
+        self.assertEqual(len(FakeFTP.instances), 2)
+
+    def test_reuses_connection_for_short_intervals(self):
+        FakeFTP.files = {"IDQ60005.html": ("20240101000000", SAMPLE_HTML)}
+        ftp_file = _FtpFile(self.URL, timedelta(seconds=30))
+
+        ftp_file.fetch()
+        self.assertIs(ftp_file.fetch(), _UNCHANGED)
+        self.assertEqual(len(FakeFTP.instances), 1)
+        self.assertFalse(FakeFTP.instances[0].closed)
+
+    def test_drops_idle_connection(self):
+        FakeFTP.files = {"IDQ60005.html": ("20240101000000", SAMPLE_HTML)}
+        ftp_file = _FtpFile(self.URL, timedelta(seconds=30))
+
+        ftp_file.fetch()
+        # Pretend the connection has sat idle past _FTP_MAX_IDLE
+        ftp_file._last_used -= 120
+
+        self.assertIs(ftp_file.fetch(), _UNCHANGED)
+        self.assertEqual(len(FakeFTP.instances), 2)
+        self.assertTrue(FakeFTP.instances[0].closed)
+        self.assertFalse(FakeFTP.instances[0].quit_sent)
+        self.assertFalse(FakeFTP.instances[1].closed)
+
+    def test_truncated_gzipped_copy(self):
+        FakeFTP.files = {
+            "IDQ60005.html": ("20240101000000", SAMPLE_HTML),
+            "IDQ60005.html.gz": ("20240101000000", gzip.compress(SAMPLE_HTML)[:120]),
+        }
+        ftp_file = _FtpFile(self.URL)
+
+        # A cut-short download fails rather than yielding partial HTML, and
+        # is not remembered, so the next fetch downloads again
+        self.assertIsNone(ftp_file.fetch())
+        self.assertIsNone(ftp_file.fetch())
+        self.assertEqual(len(FakeFTP.instances), 2)
+
+        FakeFTP.files["IDQ60005.html.gz"] = (
+            "20240101000000", gzip.compress(SAMPLE_HTML))
+        self.assertEqual(b"".join(ftp_file.fetch()), SAMPLE_HTML)
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    # Response settings, changed by the tests
+    body = SAMPLE_HTML
+    etag = None
+    truncate = False
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        _HttpHandler.requests.append(dict(self.headers))
+        if self.etag and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        data = self.body
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            if self.truncate:
+                data = data[:120]
+            self.send_header("Content-Encoding", "gzip")
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestHttpFile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _HttpHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/IDQ60005.html"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _HttpHandler.body = SAMPLE_HTML
+        _HttpHandler.etag = None
+        _HttpHandler.truncate = False
+        _HttpHandler.requests = []
+
+    def test_gzip_response(self):
+        self.assertEqual(b"".join(_HttpFile(self.url).fetch()), SAMPLE_HTML)
+        self.assertEqual(_HttpHandler.requests[0]["Accept-Encoding"], "gzip")
+
+    def test_not_modified(self):
+        _HttpHandler.etag = '"v1"'
+        http_file = _HttpFile(self.url)
+
+        self.assertEqual(b"".join(http_file.fetch()), SAMPLE_HTML)
+        self.assertIs(http_file.fetch(), _UNCHANGED)
+        self.assertEqual(_HttpHandler.requests[1]["If-None-Match"], '"v1"')
+
+    def test_truncated_gzip_response(self):
+        _HttpHandler.etag = '"v1"'
+        _HttpHandler.truncate = True
+        http_file = _HttpFile(self.url)
+
+        # The ETag of a cut-short body is not sent back on the next fetch
+        self.assertIsNone(http_file.fetch())
+        self.assertIsNone(http_file.fetch())
+        self.assertNotIn("If-None-Match", _HttpHandler.requests[1])
+
+        _HttpHandler.truncate = False
+        self.assertEqual(b"".join(http_file.fetch()), SAMPLE_HTML)
+
+    def test_digest_fallback_without_validators(self):
+        http_file = _HttpFile(self.url)
+
+        self.assertEqual(b"".join(http_file.fetch()), SAMPLE_HTML)
+        self.assertIs(http_file.fetch(), _UNCHANGED)
+
+        _HttpHandler.body = SAMPLE_HTML + b" "
+        self.assertEqual(b"".join(http_file.fetch()), SAMPLE_HTML + b" ")
+
+
 if __name__ == "__main__":
     unittest.main()